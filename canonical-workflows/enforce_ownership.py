@@ -13,30 +13,62 @@ It runs automatically on every push to main and:
 
 import os
 import sys
+import json
 import subprocess
 import yaml
 import hashlib
+import mmap
+from functools import cached_property
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
+# Prefer the libyaml-backed C loader, falling back to pure Python if unavailable
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+# orjson is optional - the stdlib json module produces the same registry layout
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 
 # Constants
 REPO_ADMIN = "nickarrow"
+REPO_ADMIN_LC = REPO_ADMIN.lower()  # Registry owners and commit authors are compared lowercased
 GUARDIAN_REPO_PATH = os.environ.get("GUARDIAN_REPO_PATH", "guardian-repo")
-REGISTRY_PATH = f"{GUARDIAN_REPO_PATH}/registry.yml"
+REGISTRY_PATH = f"{GUARDIAN_REPO_PATH}/registry.json"
+LEGACY_REGISTRY_PATH = f"{GUARDIAN_REPO_PATH}/registry.yml"  # Migrated to JSON on next save
 GUARDIAN_PAT = os.environ.get("GUARDIAN_PAT", "")
+MMAP_THRESHOLD = 1024 * 1024  # Files at least this large are hashed via mmap
+READ_CHUNK_SIZE = 1024 * 1024  # Buffer for the chunked fallback when mmap is unavailable
+CHECKSUM_WORKERS = min(8, os.cpu_count() or 1)  # hashlib releases the GIL while hashing
+# Hidden paths that dominate non-content pushes; git drops them from the diff itself.
+# Other hidden paths are still filtered in get_changed_files (.ironverse is enforced).
+DIFF_PATHSPEC = ['.', ':(exclude).github', ':(exclude,glob).git*', ':(exclude).obsidian']
 
 
 class IronverseEnforcer:
     def __init__(self):
         self.commit_author = os.environ.get("COMMIT_AUTHOR", "unknown").lower()
+        self._is_admin = self.commit_author == REPO_ADMIN_LC
         self.commit_sha = os.environ.get("COMMIT_SHA", "HEAD")
+        # Optional hint from the push event; lets the bot-commit checks skip git entirely
+        self.commit_author_email = os.environ.get("COMMIT_AUTHOR_EMAIL", "")
         self.corrections_made = False
         self.files_corrected = []
-        self.registry = self.load_registry()
         self.registry_updated = False
+        self.registry = self.load_registry()
         self.detected_moves = {}  # Maps old_path -> new_path for detected moves
+        self._pending_restores: List[str] = []  # Restored in one batch by flush_restores()
+        self._pending_adds: List[str] = []  # Worktree changes staged in one batch by stage_corrections()
+        self._registered_paths: List[str] = []  # Files added to the registry this run
+        self._checksums: Dict[str, str] = {}  # Filled in parallel by prefetch_checksums()
+        self._stats: Dict[str, Optional[os.stat_result]] = {}  # Ditto; None for files missing on disk
         
     def run(self):
         """Main enforcement pipeline"""
@@ -57,16 +89,30 @@ class IronverseEnforcer:
         
         print(f"\n📋 Processing {len(changed_files)} changed file(s)")
         
-        # Step 2: Detect moves via checksum matching (before individual processing)
+        # Hash all surviving files up front in parallel; the per-file steps below stay serial
+        self.prefetch_checksums(changed_files)
+        
+        # Step 2: Detect moves via blob id / checksum matching (before individual processing)
         self.detect_moves(changed_files)
         
         # Step 3-6: Process each file
         for file_info in changed_files:
             self.process_file(file_info)
         
+        # Restore all unauthorized changes in one batch
+        self.flush_restores()
+        
+        # A restore can replace a path registered above (e.g. a deleted file brought back
+        # where a folder of new files was added); forget those entries
+        self.drop_displaced_entries()
+        
         # Step 7: Clean up empty folders
         self.cleanup_empty_folders()
         
+        # Stage the worktree corrections before the registry is pushed, so a staging
+        # failure never leaves the guardian registry ahead of this repo
+        self.stage_corrections()
+        
         # Step 8: Clean up orphaned folder entries from registry
         self.cleanup_orphaned_folder_entries()
         
@@ -80,27 +126,61 @@ class IronverseEnforcer:
         else:
             print("\n✅ No corrections needed - all edits were valid")
     
-    def is_guardian_commit(self) -> bool:
-        """Check if the current commit is from the guardian restoration workflow"""
-        # Get commit author and message
+    @cached_property
+    def commit_meta(self) -> Optional[Tuple[str, str, str]]:
+        """Author name, author email and subject of the current commit (one git call per run)"""
         result = subprocess.run(
-            ["git", "log", "-1", "--format=%an|%ae|%s", self.commit_sha],
+            ["git", "log", "-1", "--format=%an%x00%ae%x00%s", self.commit_sha],
             capture_output=True,
             text=True
         )
         
         if result.returncode != 0:
-            return False
+            return None
         
-        output = result.stdout.strip()
-        parts = output.split('|')
+        # NUL separators - names and subjects may contain '|'
+        parts = result.stdout.rstrip('\n').split('\0')
         
         if len(parts) < 3:
+            return None
+        
+        return parts[0], parts[1], parts[2]
+    
+    @cached_property
+    def prev_tree(self) -> Dict[str, Tuple[str, str]]:
+        """Mode and blob id of every file in the previous commit (one git call per run)"""
+        result = subprocess.run(
+            ["git", "ls-tree", "-r", "-z", f"{self.commit_sha}^"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL  # No parent on a root commit - nothing to restore from
+        )
+        
+        if result.returncode != 0:
+            return {}
+        
+        tree = {}
+        # Records: "<mode> <type> <object id>\t<path>\0"
+        for record in result.stdout.split(b'\0'):
+            if not record:
+                continue
+            
+            meta, _, path = record.partition(b'\t')
+            mode, object_type, oid = meta.decode('ascii').split(' ')
+            if object_type == 'blob':
+                # Same decoding as get_changed_files, so any name in the tree can be looked up
+                tree[os.fsdecode(path)] = (mode, oid)
+        
+        return tree
+    
+    def is_guardian_commit(self) -> bool:
+        """Check if the current commit is from the guardian restoration workflow"""
+        if self.commit_author_email and self.commit_author_email != "guardian@ironverse.bot":
+            return False
+        
+        if self.commit_meta is None:
             return False
         
-        author_name = parts[0]
-        author_email = parts[1]
-        commit_message = parts[2]
+        author_name, author_email, commit_message = self.commit_meta
         
         # Check if commit is from Guardian Bot
         is_guardian_author = (
@@ -115,25 +195,13 @@ class IronverseEnforcer:
     
     def is_enforcement_commit(self) -> bool:
         """Check if the current commit is from the enforcement workflow"""
-        # Get commit author and message
-        result = subprocess.run(
-            ["git", "log", "-1", "--format=%an|%ae|%s", self.commit_sha],
-            capture_output=True,
-            text=True
-        )
-        
-        if result.returncode != 0:
+        if self.commit_author_email and self.commit_author_email != "actions@github.com":
             return False
         
-        output = result.stdout.strip()
-        parts = output.split('|')
-        
-        if len(parts) < 3:
+        if self.commit_meta is None:
             return False
         
-        author_name = parts[0]
-        author_email = parts[1]
-        commit_message = parts[2]
+        author_name, author_email, commit_message = self.commit_meta
         
         # Check if commit is from Ironverse Enforcer
         is_enforcer_author = (
@@ -147,21 +215,38 @@ class IronverseEnforcer:
         return is_enforcer_author and is_enforcer_message
     
     def load_registry(self) -> Dict:
-        """Load the ownership registry from file"""
-        if not os.path.exists(REGISTRY_PATH):
-            return {'files': {}, 'folders': {}}
-        
+        """Load the ownership registry from file (migrating the legacy YAML registry if needed)"""
         try:
-            with open(REGISTRY_PATH, 'r', encoding='utf-8') as f:
-                registry = yaml.safe_load(f) or {}
-                if 'files' not in registry:
-                    registry['files'] = {}
-                if 'folders' not in registry:
-                    registry['folders'] = {}
-                return registry
+            if os.path.exists(REGISTRY_PATH):
+                data = Path(REGISTRY_PATH).read_bytes()
+                registry = (orjson.loads(data) if orjson else json.loads(data)) or {}
+            elif os.path.exists(LEGACY_REGISTRY_PATH):
+                print(f"📦 Migrating legacy YAML registry to JSON")
+                with open(LEGACY_REGISTRY_PATH, 'r', encoding='utf-8') as f:
+                    registry = yaml.load(f, Loader=SafeLoader) or {}
+                # Force a save so the JSON registry replaces the YAML one
+                self.registry_updated = True
+            else:
+                return {'files': {}, 'folders': {}}
         except Exception as e:
             print(f"⚠️  Warning: Could not load registry: {e}")
             return {'files': {}, 'folders': {}}
+        
+        # Outside the try: a malformed entry must fail the run, not fall back to an empty
+        # registry that the next save would write over the real one
+        if 'files' not in registry:
+            registry['files'] = {}
+        if 'folders' not in registry:
+            registry['folders'] = {}
+        
+        # Owners are compared against the lowercased commit author, so normalize them once here
+        for entry in registry['files'].values():
+            if isinstance(entry.get('owner'), str):
+                entry['owner'] = entry['owner'].lower()
+        for entry in registry['folders'].values():
+            if isinstance(entry.get('structural_owner'), str):
+                entry['structural_owner'] = entry['structural_owner'].lower()
+        return registry
     
     def save_registry(self):
         """Save the ownership registry to file in guardian repo"""
@@ -169,45 +254,157 @@ class IronverseEnforcer:
             # Ensure guardian repo directory exists
             os.makedirs(os.path.dirname(REGISTRY_PATH), exist_ok=True)
             
-            with open(REGISTRY_PATH, 'w', encoding='utf-8') as f:
-                f.write("# Ironverse - File Ownership Registry\n")
-                f.write("# This file tracks ownership and integrity of all non-hidden files in the repository.\n")
-                f.write("# 'files' section: content ownership (who can edit file contents)\n")
-                f.write("# 'folders' section: structural ownership (who can move/rename within folder trees)\n")
-                f.write("# DO NOT EDIT MANUALLY - Managed automatically by the Ironverse enforcement system.\n\n")
-                yaml.dump(self.registry, f, default_flow_style=False, sort_keys=True, allow_unicode=True)
-            
-            # Commit and push to guardian repo
-            subprocess.run(['git', '-C', GUARDIAN_REPO_PATH, 'add', 'registry.yml'], check=True)
-            subprocess.run(
-                ['git', '-C', GUARDIAN_REPO_PATH, 'commit', '-m', 'Update registry from enforcement'],
+            # Machine-written, machine-read: sorted, indented JSON keeps diffs stable
+            if orjson:
+                data = orjson.dumps(
+                    self.registry,
+                    option=orjson.OPT_SORT_KEYS | orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE
+                )
+            else:
+                data = (json.dumps(self.registry, indent=2, sort_keys=True, ensure_ascii=False) + "\n").encode('utf-8')
+            
+            # Nothing to commit if the serialized registry is byte-identical to the saved one
+            if (not os.path.exists(LEGACY_REGISTRY_PATH) and os.path.exists(REGISTRY_PATH) and
+                Path(REGISTRY_PATH).read_bytes() == data):
+                print(f"💾 Registry unchanged - nothing to save")
+                return
+            
+            # Write the blob straight into the object store and index - git never re-reads the file
+            result = subprocess.run(
+                ['git', '-C', GUARDIAN_REPO_PATH, 'hash-object', '-w', '--stdin'],
+                input=data,
+                capture_output=True,
                 check=True
             )
-            subprocess.run(['git', '-C', GUARDIAN_REPO_PATH, 'push'], check=True)
+            blob_sha = result.stdout.decode('ascii').strip()
+            update_index = ['git', '-C', GUARDIAN_REPO_PATH, 'update-index', '--add',
+                            '--cacheinfo', f"100644,{blob_sha},registry.json"]
+            if os.path.exists(LEGACY_REGISTRY_PATH):
+                os.remove(LEGACY_REGISTRY_PATH)
+                update_index += ['--force-remove', 'registry.yml']
+            subprocess.run(update_index, check=True)
+            
+            # Keep the worktree in sync so later runs (and git status) see the same content;
+            # write-then-rename so an interrupted run never leaves a truncated registry behind
+            tmp_path = f"{REGISTRY_PATH}.tmp"
+            Path(tmp_path).write_bytes(data)
+            os.replace(tmp_path, REGISTRY_PATH)
+            
+            # Commit and push to guardian repo in a single shell invocation
+            self.run_git_pipeline(
+                'git commit -m "$1" && git push',
+                'Update registry from enforcement',
+                cwd=GUARDIAN_REPO_PATH
+            )
             
             print(f"💾 Registry updated in guardian repo")
         except Exception as e:
             print(f"❌ Error saving registry: {e}")
             raise
     
-    def calculate_checksum(self, file_path: str) -> str:
-        """Calculate SHA-256 checksum of a file"""
-        sha256_hash = hashlib.sha256()
+    def calculate_checksum(self, file_path: str, cached_entry: Optional[Dict] = None,
+                           st: Optional[os.stat_result] = None) -> str:
+        """Calculate SHA-256 checksum of a file, reusing cached_entry's checksum if size and mtime match"""
+        if file_path in self._checksums:
+            return self._checksums[file_path]
+        
         try:
-            with open(file_path, "rb") as f:
-                for byte_block in iter(lambda: f.read(4096), b""):
-                    sha256_hash.update(byte_block)
-            return sha256_hash.hexdigest()
+            if st is None:
+                st = os.stat(file_path)
+            if (cached_entry and cached_entry.get('checksum') and
+                cached_entry.get('size') == st.st_size and
+                cached_entry.get('mtime_ns') == st.st_mtime_ns):
+                return cached_entry['checksum']
+            
+            if hasattr(hashlib, 'file_digest'):
+                # Python 3.11+: hashlib drives the reads itself with a reusable buffer
+                with open(file_path, "rb") as f:
+                    return hashlib.file_digest(f, 'sha256').hexdigest()
+            
+            if st.st_size < MMAP_THRESHOLD:
+                # Small file - hash in one shot, no Python-level read loop
+                return hashlib.sha256(Path(file_path).read_bytes()).hexdigest()
+            
+            # Large file - map it and hash the whole buffer in a single update
+            try:
+                with open(file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    return hashlib.sha256(mm).hexdigest()
+            except (OSError, ValueError):
+                # mmap unavailable (or file shrank since stat) - fall back to chunked reads
+                sha256_hash = hashlib.sha256()
+                buf = bytearray(READ_CHUNK_SIZE)
+                view = memoryview(buf)
+                with open(file_path, "rb", buffering=0) as f:
+                    while n := f.readinto(buf):
+                        sha256_hash.update(view[:n])
+                return sha256_hash.hexdigest()
         except Exception as e:
             print(f"⚠️  Warning: Could not calculate checksum for {file_path}: {e}")
             return ""
     
+    def prefetch_checksums(self, changed_files: List[Dict]):
+        """Hash every added, modified or renamed file on a thread pool before the serial pipeline"""
+        files = self.registry['files']
+        paths = []
+        pure_renames = {}  # New path -> registry entry of the unchanged old path
+        for file_info in changed_files:
+            if file_info['status'] == 'deleted':
+                continue
+            
+            old_entry = files.get(file_info.get('old_path'))
+            if (file_info['status'] == 'renamed' and file_info['old_blob'] == file_info['blob'] and
+                    old_entry and old_entry.get('checksum')):
+                pure_renames[file_info['path']] = old_entry
+            
+            paths.append(file_info['path'])
+        
+        def checksum_if_present(path: str) -> Tuple[Optional[os.stat_result], str]:
+            st = self.stat_file(path)
+            if st is None:
+                return st, ""
+            
+            # A pure rename (R100) keeps its blob; the registered checksum is assumed to describe
+            # that blob, trusted only while the recorded size still matches the file on disk
+            old_entry = pure_renames.get(path)
+            if old_entry and old_entry.get('size') == st.st_size:
+                return st, old_entry['checksum']
+            
+            return st, self.calculate_checksum(path, files.get(path), st)
+        
+        with ThreadPoolExecutor(max_workers=CHECKSUM_WORKERS) as pool:
+            for path, (st, checksum) in zip(paths, pool.map(checksum_if_present, paths)):
+                self._stats[path] = st
+                if checksum:
+                    self._checksums[path] = checksum
+    
+    def get_file_stat(self, file_path: str, st: Optional[os.stat_result] = None) -> Dict:
+        """Get the size/mtime fields stored alongside a registry checksum"""
+        if st is None:
+            st = self.stat_file(file_path)
+            if st is None:
+                return {}
+        return {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+    
+    def changed_file_stat(self, file_path: str) -> Optional[os.stat_result]:
+        """Stat result taken by prefetch_checksums, falling back to a fresh stat"""
+        if file_path in self._stats:
+            return self._stats[file_path]
+        return self.stat_file(file_path)
+    
+    def stat_file(self, file_path: str) -> Optional[os.stat_result]:
+        """Stat a file once so the result can be shared by checksum and registry updates"""
+        try:
+            return os.stat(file_path)
+        except OSError:
+            return None
+    
     def get_changed_files(self) -> List[Dict]:
         """Get list of changed files from git diff"""
         # Get the previous commit (parent of current)
         result = subprocess.run(
             ["git", "rev-parse", f"{self.commit_sha}^"],
-            capture_output=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,  # Failing on a root commit is expected
             text=True
         )
         
@@ -217,55 +414,81 @@ class IronverseEnforcer:
         else:
             prev_commit = result.stdout.strip()
         
-        # Get diff with rename detection
+        # Get diff with rename detection; --raw also reports each side's blob id, and -z gives
+        # NUL-separated fields with paths unquoted (safe for spaces, tabs, newlines and non-ASCII)
         result = subprocess.run(
-            ["git", "diff", "--name-status", "-M", prev_commit, self.commit_sha],
+            ["git", "diff", "--raw", "-z", "--no-abbrev", "-M", prev_commit, self.commit_sha, "--", *DIFF_PATHSPEC],
             capture_output=True,
-            text=True,
             check=True
         )
         
         changed_files = []
-        for line in result.stdout.strip().split('\n'):
-            if not line:
+        # Records: ":<old mode> <new mode> <old blob> <new blob> <status>\0<path>\0[<new path>\0]"
+        fields = iter(result.stdout.split(b'\0'))
+        for header in fields:
+            if not header:
                 continue
             
-            parts = line.split('\t')
-            status = parts[0]
+            _, _, old_blob, new_blob, status = header[1:].decode('ascii').split(' ')
+            # Undecodable bytes become surrogates, so every path still round-trips to os.* calls
+            file_path = os.fsdecode(next(fields))
+            new_path = os.fsdecode(next(fields)) if status[0] in 'RC' else None
             
-            # Skip hidden files/folders (including .github - protected by Guardian)
-            # Exception: .ironverse folder should be tracked (hidden from Obsidian but enforced)
-            file_path = parts[1]
-            is_ironverse_folder = file_path.startswith('.ironverse/')
+            # The registry can only store UTF-8 names; split a rename touching any other name into
+            # its two sides, so an owned file can't leave enforcement by taking an unstorable name
+            if status.startswith('R') and not (self.is_utf8_path(file_path) and self.is_utf8_path(new_path)):
+                sides = [('D', file_path, None), ('A', new_path, None)]
+            else:
+                sides = [(status, file_path, new_path)]
             
-            if not is_ironverse_folder:
-                path_parts = file_path.split('/')
-                if any(p.startswith('.') for p in path_parts):
+            for status, file_path, new_path in sides:
+                if not self.is_utf8_path(file_path):
+                    print(f"⚠️  Warning: Skipping path that is not valid UTF-8: {file_path!r}")
                     continue
-            
-            if status.startswith('R'):  # Rename
-                old_path = parts[1]
-                new_path = parts[2]
-                changed_files.append({
-                    'status': 'renamed',
-                    'old_path': old_path,
-                    'path': new_path
-                })
-            elif status == 'D':  # Deleted
-                changed_files.append({
-                    'status': 'deleted',
-                    'path': parts[1]
-                })
-            elif status in ['A', 'M']:  # Added or Modified
-                changed_files.append({
-                    'status': 'added' if status == 'A' else 'modified',
-                    'path': parts[1]
-                })
+                
+                # Skip hidden files/folders (including .github - protected by Guardian)
+                # Exception: .ironverse folder should be tracked (hidden from Obsidian but enforced)
+                is_ironverse_folder = file_path.startswith('.ironverse/')
+                
+                # A component starts with '.' exactly when "/." occurs in "/" + path
+                if not is_ironverse_folder and '/.' in '/' + file_path:
+                    continue
+                
+                if status.startswith('R'):  # Rename
+                    changed_files.append({
+                        'status': 'renamed',
+                        'old_path': file_path,
+                        'path': new_path,
+                        'old_blob': old_blob,
+                        'blob': new_blob
+                    })
+                elif status == 'D':  # Deleted
+                    changed_files.append({
+                        'status': 'deleted',
+                        'path': file_path,
+                        'old_blob': old_blob,
+                        'blob': new_blob
+                    })
+                elif status in ['A', 'M']:  # Added or Modified
+                    changed_files.append({
+                        'status': 'added' if status == 'A' else 'modified',
+                        'path': file_path,
+                        'old_blob': old_blob,
+                        'blob': new_blob
+                    })
         
         return changed_files
     
+    def is_utf8_path(self, path: str) -> bool:
+        """Check that a path decoded from git holds no undecodable (surrogate-escaped) bytes"""
+        try:
+            path.encode('utf-8')
+        except UnicodeEncodeError:
+            return False
+        return True
+    
     def detect_moves(self, changed_files: List[Dict]):
-        """Detect file moves by matching deletions with additions via checksum"""
+        """Detect file moves by matching deletions with additions via git blob id, then checksum"""
         deletions = {f['path']: f for f in changed_files if f['status'] == 'deleted'}
         additions = {f['path']: f for f in changed_files if f['status'] == 'added'}
         
@@ -274,73 +497,81 @@ class IronverseEnforcer:
         
         print(f"\n🔍 Detecting moves ({len(deletions)} deletions, {len(additions)} additions)")
         
-        matched_deletions = set()
-        matched_additions = set()
+        registry_files = self.registry['files']
         
-        for del_path in deletions:
-            if del_path not in self.registry['files']:
-                continue
-            
-            old_checksum = self.registry['files'][del_path].get('checksum')
-            if not old_checksum:
+        # Git already reports blob ids for both sides - pair identical content without reading files
+        additions_by_blob: Dict[str, List[str]] = {}
+        for add_path, add_info in additions.items():
+            additions_by_blob.setdefault(add_info['blob'], []).append(add_path)
+        
+        unmatched_deletions = []
+        for del_path, del_info in deletions.items():
+            if not registry_files.get(del_path, {}).get('checksum'):
                 continue
             
-            for add_path in additions:
-                if add_path in matched_additions:
-                    continue
-                
-                if not os.path.exists(add_path):
-                    continue
-                
-                new_checksum = self.calculate_checksum(add_path)
-                if old_checksum == new_checksum:
-                    self.detected_moves[del_path] = add_path
-                    matched_deletions.add(del_path)
-                    matched_additions.add(add_path)
-                    print(f"   📦 Detected move: {del_path} → {add_path}")
-                    break
+            candidates = additions_by_blob.get(del_info['old_blob'])
+            if candidates:
+                self.record_detected_move(del_path, candidates.pop(0))
+            else:
+                unmatched_deletions.append(del_path)
+        
+        # Residue git couldn't pair (e.g. registry checksum differs from the parent blob)
+        if unmatched_deletions:
+            self.match_moves_by_checksum(unmatched_deletions, list(additions))
         
         if self.detected_moves:
             print(f"   Found {len(self.detected_moves)} move(s)")
     
+    def match_moves_by_checksum(self, deletions: List[str], additions: List[str]):
+        """Match registered deletions to still-unmatched additions via registry checksum"""
+        # Index remaining added files by checksum (already hashed by prefetch_checksums)
+        matched_additions = set(self.detected_moves.values())
+        additions_by_checksum: Dict[str, List[str]] = {}
+        for add_path in additions:
+            checksum = self._checksums.get(add_path)
+            if checksum and add_path not in matched_additions:
+                additions_by_checksum.setdefault(checksum, []).append(add_path)
+        
+        for del_path in deletions:
+            candidates = additions_by_checksum.get(self.registry['files'][del_path]['checksum'])
+            if candidates:
+                self.record_detected_move(del_path, candidates.pop(0))
+    
+    def record_detected_move(self, old_path: str, new_path: str):
+        """Remember a deletion/addition pair as a move"""
+        self.detected_moves[old_path] = new_path
+        print(f"   📦 Detected move: {old_path} → {new_path}")
+    
     def get_structural_owner(self, path: str) -> Optional[str]:
         """Get the structural owner for a path by walking up the folder hierarchy"""
-        path_obj = Path(path)
+        folders = self.registry.get('folders', {})
         
-        # Walk up the directory tree
-        for parent in [path_obj.parent] + list(path_obj.parent.parents):
-            parent_str = str(parent)
-            if parent_str == '.':
-                break
-            
-            if parent_str in self.registry.get('folders', {}):
-                return self.registry['folders'][parent_str].get('structural_owner')
+        # Walk up the directory tree with plain string slicing (no Path objects per call)
+        parent = path.rpartition('/')[0]
+        while parent:
+            if parent in folders:
+                return folders[parent].get('structural_owner')
+            parent = parent.rpartition('/')[0]
         
         return None
     
     def register_folder_ownership(self, file_path: str):
         """Register folder ownership for all folders in a file's path"""
-        path_obj = Path(file_path)
-        folders_to_register = []
-        
-        # Collect all parent folders
-        for parent in path_obj.parents:
-            parent_str = str(parent)
-            if parent_str == '.':
-                break
-            folders_to_register.append(parent_str)
+        folders = self.registry['folders']
         
-        # Process from root to leaf (reverse order)
-        folders_to_register.reverse()
-        
-        for folder in folders_to_register:
-            if folder not in self.registry.get('folders', {}):
+        # Process from root to leaf, one path separator at a time
+        sep = file_path.find('/')
+        while sep != -1:
+            folder = file_path[:sep]
+            sep = file_path.find('/', sep + 1)
+            
+            if folder not in folders:
                 # Check if there's a parent with ownership to inherit from
                 existing_owner = self.get_structural_owner(folder + "/dummy")
                 
                 if existing_owner is None:
                     # No parent owner - this user becomes the structural owner
-                    self.registry['folders'][folder] = {
+                    folders[folder] = {
                         'structural_owner': self.commit_author,
                         'created': self.get_iso_timestamp()
                     }
@@ -350,15 +581,15 @@ class IronverseEnforcer:
     def is_move_authorized(self, old_path: str, new_path: str) -> Tuple[bool, str]:
         """Check if a move operation is authorized"""
         file_entry = self.registry['files'].get(old_path, {})
-        content_owner = file_entry.get('owner', '').lower()
+        content_owner = file_entry.get('owner', '')
         
         # Check for admin override
         admin_override = file_entry.get('admin_override', False)
-        if self.commit_author.lower() == REPO_ADMIN.lower() and admin_override:
+        if self._is_admin and admin_override:
             return True, "admin_override"
         
         # Content owner can always move their own files
-        if self.commit_author.lower() == content_owner:
+        if self.commit_author == content_owner:
             return True, "content_owner"
         
         # Check structural ownership of source and destination
@@ -367,8 +598,8 @@ class IronverseEnforcer:
         
         # Structural owner of both paths can move files within their structure
         if (source_structural_owner and 
-            source_structural_owner.lower() == self.commit_author.lower() and
-            (dest_structural_owner is None or dest_structural_owner.lower() == self.commit_author.lower())):
+            source_structural_owner == self.commit_author and
+            (dest_structural_owner is None or dest_structural_owner == self.commit_author)):
             return True, "structural_owner"
         
         return False, f"content_owner={content_owner}, source_structural={source_structural_owner}, dest_structural={dest_structural_owner}"
@@ -390,8 +621,9 @@ class IronverseEnforcer:
             self.handle_rename(file_info)
             return
         
-        # Check if file exists (might have been deleted)
-        if not os.path.exists(path):
+        # Check if file exists (might have been deleted); prefetch already stat'ed it
+        file_info['stat'] = self.changed_file_stat(path)
+        if file_info['stat'] is None:
             return
         
         # Process based on status
@@ -413,7 +645,8 @@ class IronverseEnforcer:
         self.register_folder_ownership(path)
         
         # Calculate checksum
-        checksum = self.calculate_checksum(path)
+        st = file_info.get('stat')
+        checksum = self.calculate_checksum(path, st=st)
         
         # Determine owner (creator is the owner)
         owner = self.commit_author
@@ -424,8 +657,10 @@ class IronverseEnforcer:
             'owner': owner,
             'created': timestamp,
             'modified': timestamp,
-            'checksum': checksum
+            'checksum': checksum,
+            **self.get_file_stat(path, st)
         }
+        self._registered_paths.append(path)
         self.registry_updated = True
         
         print(f"   ➕ Added to registry (owner: {owner})")
@@ -434,17 +669,20 @@ class IronverseEnforcer:
         """Handle a modified file"""
         path = file_info['path']
         
-        # Calculate current checksum
-        current_checksum = self.calculate_checksum(path)
+        files = self.registry['files']
         
         # Check if file is in registry
-        if path not in self.registry['files']:
+        if path not in files:
             # File not in registry - treat as new file
             print(f"   ⚠️  File not in registry, treating as new")
             self.handle_new_file(file_info)
             return
         
-        file_entry = self.registry['files'][path]
+        file_entry = files[path]
+        
+        # Calculate current checksum (skipped if size/mtime match the registry entry)
+        st = file_info.get('stat')
+        current_checksum = self.calculate_checksum(path, file_entry, st)
         registry_checksum = file_entry.get('checksum', '')
         
         # Check if file actually changed
@@ -457,9 +695,9 @@ class IronverseEnforcer:
         
         # Check for admin override
         admin_override = file_entry.get('admin_override', False)
-        has_admin_override = (self.commit_author.lower() == REPO_ADMIN.lower() and admin_override is True)
+        has_admin_override = (self._is_admin and admin_override is True)
         
-        is_authorized = (self.commit_author.lower() == file_owner.lower() or has_admin_override)
+        is_authorized = (self.commit_author == file_owner or has_admin_override)
         
         if not is_authorized:
             print(f"   ❌ Unauthorized edit (owner: {file_owner}, editor: {self.commit_author})")
@@ -475,6 +713,7 @@ class IronverseEnforcer:
             
             file_entry['modified'] = self.get_iso_timestamp()
             file_entry['checksum'] = current_checksum
+            file_entry.update(self.get_file_stat(path, st))
             self.registry_updated = True
             print(f"   ✅ Valid edit - registry updated")
     
@@ -482,30 +721,31 @@ class IronverseEnforcer:
         """Handle a renamed/moved file"""
         old_path = file_info['old_path']
         new_path = file_info['path']
+        files = self.registry['files']
         
         # Check if old file is in registry
-        if old_path not in self.registry['files']:
+        if old_path not in files:
             print(f"   ⚠️  Original file not in registry, treating as new")
             self.handle_new_file(file_info)
             return
         
-        file_entry = self.registry['files'][old_path]
+        file_entry = files[old_path]
         file_owner = file_entry.get('owner', '')
         
         # Check for admin override
         admin_override = file_entry.get('admin_override', False)
-        has_admin_override = (self.commit_author.lower() == REPO_ADMIN.lower() and admin_override is True)
+        has_admin_override = (self._is_admin and admin_override is True)
         
         # Check if authorized: content owner, structural owner, or admin override
-        is_content_owner = (self.commit_author.lower() == file_owner.lower())
+        is_content_owner = (self.commit_author == file_owner)
         
         # Check structural ownership
         source_structural_owner = self.get_structural_owner(old_path)
         dest_structural_owner = self.get_structural_owner(new_path)
         is_structural_owner = (
             source_structural_owner and 
-            source_structural_owner.lower() == self.commit_author.lower() and
-            (dest_structural_owner is None or dest_structural_owner.lower() == self.commit_author.lower())
+            source_structural_owner == self.commit_author and
+            (dest_structural_owner is None or dest_structural_owner == self.commit_author)
         )
         
         is_authorized = is_content_owner or is_structural_owner or has_admin_override
@@ -516,7 +756,7 @@ class IronverseEnforcer:
             self.restore_file_from_history(old_path)
             if os.path.exists(new_path):
                 os.remove(new_path)
-                subprocess.run(['git', 'add', new_path], check=True)
+                self._pending_adds.append(new_path)
             self.files_corrected.append(old_path)
             self.corrections_made = True
         else:
@@ -530,18 +770,23 @@ class IronverseEnforcer:
             self.register_folder_ownership(new_path)
             
             # Calculate new checksum
-            checksum = self.calculate_checksum(new_path)
+            st = self.changed_file_stat(new_path)
+            checksum = self.calculate_checksum(new_path, st=st)
+            
+            timestamp = self.get_iso_timestamp()
             
             # Move entry to new path (preserve content owner, without admin_override flag)
-            self.registry['files'][new_path] = {
+            files[new_path] = {
                 'owner': file_owner,
-                'created': file_entry.get('created', self.get_iso_timestamp()),
-                'modified': self.get_iso_timestamp(),
-                'checksum': checksum
+                'created': file_entry.get('created', timestamp),
+                'modified': timestamp,
+                'checksum': checksum,
+                **self.get_file_stat(new_path, st)
             }
             
             # Remove old entry
-            del self.registry['files'][old_path]
+            del files[old_path]
+            self._registered_paths.append(new_path)
             self.registry_updated = True
             
             print(f"   ✅ Valid rename - registry updated")
@@ -556,19 +801,21 @@ class IronverseEnforcer:
             self.handle_detected_move(path, new_path)
             return
         
+        files = self.registry['files']
+        
         # Check if file is in registry
-        if path not in self.registry['files']:
+        if path not in files:
             print(f"   ⚠️  File not in registry, allowing deletion")
             return
         
-        file_entry = self.registry['files'][path]
+        file_entry = files[path]
         file_owner = file_entry.get('owner', '')
         
         # Check for admin override
         admin_override = file_entry.get('admin_override', False)
-        has_admin_override = (self.commit_author.lower() == REPO_ADMIN.lower() and admin_override is True)
+        has_admin_override = (self._is_admin and admin_override is True)
         
-        is_authorized = (self.commit_author.lower() == file_owner.lower() or has_admin_override)
+        is_authorized = (self.commit_author == file_owner or has_admin_override)
         
         if not is_authorized:
             print(f"   ❌ Unauthorized deletion (owner: {file_owner}, editor: {self.commit_author})")
@@ -580,7 +827,7 @@ class IronverseEnforcer:
             if has_admin_override:
                 print(f"   🔑 Admin override used for deletion (owner: {file_owner}, admin: {self.commit_author})")
             
-            del self.registry['files'][path]
+            del files[path]
             self.registry_updated = True
             print(f"   ✅ Valid deletion - removed from registry")
     
@@ -588,8 +835,9 @@ class IronverseEnforcer:
         """Handle a move that was detected via checksum matching"""
         print(f"\n📦 Processing detected move: {old_path} → {new_path}")
         
+        files = self.registry['files']
         is_authorized, reason = self.is_move_authorized(old_path, new_path)
-        file_entry = self.registry['files'].get(old_path, {})
+        file_entry = files.get(old_path, {})
         content_owner = file_entry.get('owner', '')
         
         if not is_authorized:
@@ -600,7 +848,7 @@ class IronverseEnforcer:
             self.restore_file_from_history(old_path)
             if os.path.exists(new_path):
                 os.remove(new_path)
-                subprocess.run(['git', 'add', new_path], check=True)
+                self._pending_adds.append(new_path)
             
             self.files_corrected.append(old_path)
             self.corrections_made = True
@@ -611,23 +859,28 @@ class IronverseEnforcer:
             self.register_folder_ownership(new_path)
             
             # Calculate new checksum (should match, but recalculate for safety)
-            checksum = self.calculate_checksum(new_path)
+            st = self.changed_file_stat(new_path)
+            checksum = self.calculate_checksum(new_path, st=st)
             
             # Remove admin_override if it was used
             admin_override = file_entry.get('admin_override', False)
-            if self.commit_author.lower() == REPO_ADMIN.lower() and admin_override:
+            if self._is_admin and admin_override:
                 print(f"   🔑 Admin override consumed")
             
+            timestamp = self.get_iso_timestamp()
+            
             # Move entry to new path (preserve content owner)
-            self.registry['files'][new_path] = {
+            files[new_path] = {
                 'owner': content_owner,
-                'created': file_entry.get('created', self.get_iso_timestamp()),
-                'modified': self.get_iso_timestamp(),
-                'checksum': checksum
+                'created': file_entry.get('created', timestamp),
+                'modified': timestamp,
+                'checksum': checksum,
+                **self.get_file_stat(new_path, st)
             }
             
             # Remove old entry
-            del self.registry['files'][old_path]
+            del files[old_path]
+            self._registered_paths.append(new_path)
             self.registry_updated = True
             
             print(f"   📝 Registry updated (content owner preserved: {content_owner})")
@@ -635,34 +888,91 @@ class IronverseEnforcer:
 
     
     def restore_file_from_history(self, path: str, is_new_file: bool = False):
-        """Restore file to its state in the previous commit, or delete if new"""
+        """Queue file to be restored to its state in the previous commit, or delete if new"""
         if is_new_file:
             # New file with unauthorized ownership - delete it
             if os.path.exists(path):
                 os.remove(path)
-                subprocess.run(['git', 'add', path], check=True)
+                self._pending_adds.append(path)
                 print(f"   🗑️  Deleted unauthorized new file")
             return
         
-        result = subprocess.run(
-            ["git", "checkout", f"{self.commit_sha}^", "--", path],
-            capture_output=True,
-            text=True
-        )
+        self._pending_restores.append(path)
+        print(f"   🔄 Queued for restore from previous commit")
+    
+    def flush_restores(self):
+        """Restore all queued files from the previous commit in one batch"""
+        if not self._pending_restores:
+            return
         
-        if result.returncode == 0:
-            subprocess.run(['git', 'add', path], check=True)
-            print(f"   🔄 Restored from previous commit")
-        else:
-            # File doesn't exist in history - must be new, delete it
+        paths = list(dict.fromkeys(self._pending_restores))
+        self._pending_restores = []
+        
+        print(f"\n🔄 Restoring {len(paths)} file(s) from previous commit")
+        
+        restored = [path for path in paths if path in self.prev_tree]
+        missing = [path for path in paths if path not in self.prev_tree]
+        
+        if restored:
+            # Point the index at the previous blobs, then let git write the worktree: checkout-index
+            # replaces a leading symlink or file instead of writing through it, and honours the mode
+            index_info = []
+            for path in restored:
+                mode, oid = self.prev_tree[path]
+                index_info.append(f"{mode} {oid}\t{path}\0")
+            self.run_git_with_input(['update-index', '-z', '--index-info'], ''.join(index_info))
+            self.run_git_with_input(['checkout-index', '-f', '-z', '--stdin'], '\0'.join(restored) + '\0')
+            
+            for path in restored:
+                print(f"   🔄 Restored: {path}")
+        
+        # Files that don't exist in history must be new - delete them
+        for path in missing:
             if os.path.exists(path):
                 os.remove(path)
-                subprocess.run(['git', 'add', path], check=True)
-                print(f"   🗑️  Deleted unauthorized new file (no history found)")
+                self._pending_adds.append(path)
+                print(f"   🗑️  Deleted unauthorized new file (no history found): {path}")
             else:
-                print(f"   ⚠️  Could not restore file: {result.stderr}")
+                print(f"   ⚠️  Could not restore file (no history found): {path}")
     
-
+    def drop_displaced_entries(self):
+        """Remove registry entries for files registered this run that are no longer on disk"""
+        files = self.registry['files']
+        
+        for path in self._registered_paths:
+            # The path may now be missing, or a restored directory in place of the new file
+            if path in files and not (os.path.islink(path) or os.path.isfile(path)):
+                del files[path]
+                self.registry_updated = True
+                print(f"   🗑️  Dropped registry entry replaced by a restore: {path}")
+    
+    def stage_corrections(self):
+        """Stage every restored, rewritten or removed file with a single git call"""
+        if not self._pending_adds:
+            return
+        
+        paths = list(dict.fromkeys(self._pending_adds))
+        self._pending_adds = []
+        
+        # -A stages removals too; the explicit pathspec keeps the guardian checkout out of the index.
+        # Paths go over stdin NUL-separated, so any count and any filename is safe.
+        self.run_git_with_input(
+            ['--literal-pathspecs', 'add', '-A', '--pathspec-from-file=-', '--pathspec-file-nul'],
+            '\0'.join(paths)
+        )
+    
+    def run_git_with_input(self, args: List[str], data: str):
+        """Run a git command fed on stdin, raising with git's own message if it fails"""
+        result = subprocess.run(
+            ['git', *args],
+            input=os.fsencode(data),  # Surrogate-escaped paths go back out as their original bytes
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE
+        )
+        
+        if result.returncode != 0:
+            command = next(arg for arg in args if not arg.startswith('-'))
+            raise RuntimeError(f"git {command} failed: {result.stderr.decode('utf-8', 'replace').strip()}")
     
     def get_iso_timestamp(self) -> str:
         """Get current timestamp in ISO 8601 format"""
@@ -672,24 +982,40 @@ class IronverseEnforcer:
         """Remove empty folders from the repository (excluding hidden folders)"""
         empty_folders = []
         
-        # Walk the directory tree bottom-up
-        for root, dirs, files in os.walk('.', topdown=False):
-            # Skip hidden folders
-            if any(part.startswith('.') for part in Path(root).parts):
-                continue
+        def prune(path: str) -> bool:
+            """Remove empty visible subfolders bottom-up; True if path has no visible content left"""
+            subdirs = []
+            is_empty = True
             
-            # Check if directory is empty (no files and no non-hidden subdirs)
+            # One scandir per directory; hidden entries (e.g. .git) are never descended into
             try:
-                contents = list(os.listdir(root))
-                # Filter out hidden items
-                visible_contents = [item for item in contents if not item.startswith('.')]
-                
-                if not visible_contents and root != '.':
-                    empty_folders.append(root)
-                    os.rmdir(root)
+                with os.scandir(path) as entries:
+                    for entry in entries:
+                        if entry.name.startswith('.'):
+                            continue
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                        else:
+                            is_empty = False
             except OSError:
-                # Directory not empty or permission issue, skip
-                continue
+                # Unreadable or vanished directory - treat it as non-empty and leave it alone
+                return False
+            
+            for subdir in subdirs:
+                if not prune(subdir):
+                    is_empty = False
+                    continue
+                try:
+                    os.rmdir(subdir)
+                except OSError:
+                    # Directory still holds hidden items or permission issue, skip
+                    is_empty = False
+                    continue
+                empty_folders.append(subdir)
+            
+            return is_empty
+        
+        prune('.')
         
         if empty_folders:
             print(f"\n🧹 Cleaned up {len(empty_folders)} empty folder(s):")
@@ -733,14 +1059,23 @@ class IronverseEnforcer:
         else:
             print(f"\n📝 Committing registry updates")
         
-        subprocess.run(
-            ['git', 'commit', '-m', 'Enforced ownership rules'],
-            check=True
-        )
-        
-        subprocess.run(['git', 'push'], check=True)
+        # Corrections were staged by stage_corrections(); a blanket -A is avoided here because
+        # the guardian repo checkout lives inside this working tree
+        self.run_git_pipeline('git commit -m "$1" && git push', 'Enforced ownership rules')
         
         print("✅ Corrections committed and pushed")
+    
+    def run_git_pipeline(self, script: str, message: str, cwd: Optional[str] = None):
+        """Run a chain of git commands in one shell, passing the commit message as $1"""
+        result = subprocess.run(
+            ['sh', '-c', script, 'sh', message],
+            cwd=cwd,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE
+        )
+        
+        if result.returncode != 0:
+            raise RuntimeError(f"'{script}' failed: {result.stderr.decode('utf-8', 'replace').strip()}")
 
 
 if __name__ == "__main__":